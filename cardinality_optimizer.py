@@ -0,0 +1,252 @@
+import os
+import time
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from scipy.optimize import minimize, OptimizeResult
+
+# --- ======================================================================= ---
+# --- CARDINALITY-CONSTRAINED OPTIMIZER (at most k funds, min position size) ---
+# --- ======================================================================= ---
+
+# Solved exactly by branch-and-bound. Every node is the usual continuous
+# minimum-variance problem (target return, fully invested) with some funds
+# forced in (weight >= min_position) and some forced out (weight = 0). Its
+# optimum is a lower bound for every allocation below it in the tree.
+#
+# Node state per fund: -1 = forced out, 0 = free, 1 = forced in.
+
+weight_tol = 1e-6
+bound_tol = 1e-10
+
+# Problem data and shared incumbent, set once per worker process by _init_worker
+_problem = None
+_incumbent = None
+
+
+def _init_worker(problem, incumbent):
+    global _problem, _incumbent
+    _problem = problem
+    _incumbent = incumbent
+
+
+def _node_bounds(state):
+    floors = _problem['floors']
+    lower = np.where(state == 1, np.maximum(floors, _problem['min_position']), floors)
+    upper = np.where(state == -1, 0.0, 1.0)
+    lower = np.where(state == -1, 0.0, lower)
+    return lower, upper
+
+
+def _active_set_qp(hessian, A, b, lower, upper, x0, max_iter=50):
+    # Primal-dual active-set method for min w'Hw/2 s.t. Aw = b, lower <= w <= upper.
+    # Warm-started from the parent's solution it usually settles in a few solves.
+    # Returns None when it does not converge, so the caller can fall back to SLSQP.
+    at_lower = (x0 <= lower + weight_tol) | (lower == upper)
+    at_upper = (x0 >= upper - weight_tol) & ~at_lower
+    num_eq = len(b)
+    for _ in range(max_iter):
+        free = ~(at_lower | at_upper)
+        if free.sum() < num_eq:
+            return None
+        # Equality-constrained QP over the free funds, with the others held at their bounds
+        x = np.where(at_upper, upper, lower * ~free)
+        idx = np.flatnonzero(free); num_free = len(idx)
+        kkt = np.zeros((num_free + num_eq, num_free + num_eq))
+        kkt[:num_free, :num_free] = hessian[np.ix_(idx, idx)]
+        kkt[:num_free, num_free:] = A[:, idx].T
+        kkt[num_free:, :num_free] = A[:, idx]
+        rhs = np.concatenate([-(hessian[idx] @ x), b - A @ x])
+        try:
+            solution = np.linalg.solve(kkt, rhs)
+        except np.linalg.LinAlgError:
+            return None
+        x[idx] = solution[:num_free]
+        multipliers = hessian @ x + A.T @ solution[num_free:]
+        new_lower = ((multipliers + (lower - x) > 0) & ~free | (x < lower)) & ~at_upper | (lower == upper)
+        new_upper = ((multipliers + (upper - x) < 0) & ~free | (x > upper)) & ~new_lower
+        if np.array_equal(new_lower, at_lower) and np.array_equal(new_upper, at_upper):
+            # Converged: check the KKT conditions so the bound is a true lower bound
+            ok = (np.all(x >= lower - weight_tol) and np.all(x <= upper + weight_tol)
+                  and np.all(multipliers[at_lower & (lower < upper)] >= -1e-9)
+                  and np.all(multipliers[at_upper] <= 1e-9))
+            return x if ok else None
+        at_lower, at_upper = new_lower, new_upper
+    return None
+
+
+def _solve_relaxation(state, x0):
+    mu, cov, target = _problem['expected_returns'], _problem['cov_matrix'], _problem['target_return']
+    lower, upper = _node_bounds(state)
+    if lower.sum() > 1 + weight_tol or upper.sum() < 1 - weight_tol:
+        return None, None
+    # Warm start from the parent's solution, pushed inside this node's bounds
+    x0 = np.clip(x0, lower, upper)
+    x = _active_set_qp(_problem['hessian'], _problem['A'], np.array([target, 1.0]), lower, upper, x0)
+    if x is None:
+        cons = (
+            {'type': 'eq', 'fun': lambda w: w @ mu - target, 'jac': lambda w: mu},
+            {'type': 'eq', 'fun': lambda w: np.sum(w) - 1, 'jac': lambda w: np.ones_like(w)},
+        )
+        result = minimize(fun=lambda w: w @ cov @ w, jac=lambda w: 2 * cov @ w, x0=x0,
+                          method='SLSQP', bounds=list(zip(lower, upper)), constraints=cons, options={'maxiter': 500, 'ftol': 1e-12})
+        if not result.success:
+            return None, None
+        x = result.x
+    x = np.where(x < weight_tol, 0.0, x)
+    return float(x @ cov @ x), x
+
+
+def _is_feasible(x):
+    held = x > weight_tol
+    return held.sum() <= _problem['max_holdings'] and np.all(x[held] >= _problem['min_position'] - weight_tol)
+
+
+def _branch(state, x, bound):
+    # Children inherit the parent's bound and solution (for pruning and warm starts).
+    # The "in" child comes last so depth-first search pops it first.
+    free_held = np.where((state == 0) & (x > weight_tol))[0]
+    if (state == 1).sum() >= _problem['max_holdings']:
+        child = state.copy(); child[state == 0] = -1
+        return [(bound, child, x)]
+    i = free_held[np.argmax(x[free_held])]
+    out_child = state.copy(); out_child[i] = -1
+    in_child = state.copy(); in_child[i] = 1
+    return [(bound, out_child, x), (bound, in_child, x)]
+
+
+def _process_node(node):
+    # Returns (children, solution): solution is (variance, x) if the node is a feasible leaf
+    bound, state, x0 = node
+    if (state == 1).sum() > _problem['max_holdings'] or bound >= _incumbent.value - bound_tol:
+        return [], None
+    variance, x = _solve_relaxation(state, x0)
+    if x is None or variance >= _incumbent.value - bound_tol:
+        return [], None
+    if _is_feasible(x):
+        return [], (variance, x)
+    return _branch(state, x, variance), None
+
+
+def _offer_incumbent(variance, x, best):
+    # Publish to every worker through the shared value; keep the weights locally
+    with _incumbent.get_lock():
+        if variance < _incumbent.value:
+            _incumbent.value = variance
+            return (variance, x)
+    return best
+
+
+def _explore_subtree(node, deadline):
+    # Depth-first search of one subtree, run inside a worker process
+    stack, best, nodes = [node], None, 0
+    while stack:
+        if time.time() > deadline:
+            return best, nodes, min(n[0] for n in stack)
+        children, solution = _process_node(stack.pop())
+        nodes += 1
+        if solution is not None:
+            best = _offer_incumbent(solution[0], solution[1], best)
+        stack.extend(children)
+    return best, nodes, np.inf
+
+
+def _rounding_heuristic(x_relaxed):
+    # Keep the k largest relaxed weights (forced funds first) and re-solve on that support
+    state = np.where(_problem['floors'] > 0, 1, 0)
+    order = np.argsort(-(x_relaxed + 2 * (state == 1)))
+    keep = order[:_problem['max_holdings']]
+    state = np.full_like(state, -1); state[keep] = 0
+    variance, x = _solve_relaxation(state, x_relaxed)
+    if x is not None and _is_feasible(x):
+        return variance, x
+    return None
+
+
+def solve_cardinality_constrained(expected_returns, cov_matrix, target_return, max_holdings,
+                                  min_position=0.0, min_weights=None, time_limit=60, workers=None, verbose=True):
+    """Minimum-volatility allocation with at most max_holdings funds, each >= min_position.
+
+    min_weights is an array of per-fund minimums (the scenario 'constraints');
+    those funds are always held. Returns a scipy OptimizeResult with x, fun
+    (volatility), success and message, plus nodes, optimal, lower_bound and gap.
+    optimal is False if the time limit stopped the search first; x is then the
+    best allocation found so far.
+    """
+    start_time = time.time()
+    deadline = start_time + time_limit
+    expected_returns = np.asarray(expected_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    num_assets = len(expected_returns)
+    floors = np.zeros(num_assets) if min_weights is None else np.asarray(min_weights, dtype=float)
+    workers = workers or os.cpu_count() or 1
+    problem = {
+        'expected_returns': expected_returns, 'cov_matrix': cov_matrix, 'target_return': target_return,
+        'floors': floors, 'max_holdings': max_holdings, 'min_position': min_position,
+        'hessian': 2 * cov_matrix, 'A': np.vstack([expected_returns, np.ones(num_assets)]),
+    }
+    incumbent = multiprocessing.Value('d', np.inf)
+    _init_worker(problem, incumbent)
+    best = None
+
+    def report(message):
+        if verbose: print(f"  [B&B {time.time() - start_time:6.1f}s] {message}")
+
+    # --- Best-first search in this process until there are enough open subtrees ---
+    root_state = np.where(floors > 0, 1, 0)
+    open_nodes = [(0.0, 0, root_state, np.full(num_assets, 1 / num_assets))]
+    counter, nodes, heuristic_done = 1, 0, False
+    while open_nodes and len(open_nodes) < 4 * workers and time.time() < deadline:
+        bound, _, state, x0 = heapq.heappop(open_nodes)
+        children, solution = _process_node((bound, state, x0))
+        nodes += 1
+        if solution is not None:
+            best = _offer_incumbent(solution[0], solution[1], best)
+            report(f"incumbent volatility {np.sqrt(best[0]):.4%} (node {nodes})")
+        if not heuristic_done and children:
+            heuristic_done = True
+            heuristic = _rounding_heuristic(children[0][2])
+            if heuristic is not None:
+                best = _offer_incumbent(heuristic[0], heuristic[1], best)
+                report(f"incumbent volatility {np.sqrt(best[0]):.4%} (rounding heuristic)")
+        for child_bound, child_state, child_x in children:
+            heapq.heappush(open_nodes, (child_bound, counter, child_state, child_x)); counter += 1
+
+    # --- Explore the remaining subtrees in parallel, sharing the incumbent ---
+    lower_bound = np.inf
+    subtrees = [(b, s, x) for b, _, s, x in open_nodes]
+    if subtrees and time.time() < deadline:
+        report(f"exploring {len(subtrees)} subtrees on {workers} workers")
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(problem, incumbent)) as pool:
+                futures = [pool.submit(_explore_subtree, node, deadline) for node in subtrees]
+                outcomes = []
+                for future in as_completed(futures):
+                    outcomes.append(future.result())
+                    report(f"subtree {len(outcomes)}/{len(futures)} done, incumbent volatility {np.sqrt(incumbent.value):.4%}")
+        else:
+            outcomes = [_explore_subtree(node, deadline) for node in subtrees]
+        for subtree_best, subtree_nodes, subtree_open_bound in outcomes:
+            nodes += subtree_nodes
+            lower_bound = min(lower_bound, subtree_open_bound)
+            if subtree_best is not None and (best is None or subtree_best[0] < best[0]):
+                best = subtree_best
+    elif subtrees:
+        lower_bound = min(b for b, _, _ in subtrees)
+
+    optimal = best is not None and lower_bound >= best[0] - bound_tol
+    if best is None:
+        return OptimizeResult(x=None, fun=np.nan, success=False, nodes=nodes, optimal=False,
+                              lower_bound=np.nan, gap=np.nan,
+                              message='no allocation found within the holdings limit' if lower_bound == np.inf
+                              else 'time limit reached before any allocation was found')
+    variance, x = best
+    lower_bound = min(lower_bound, variance)
+    gap = np.sqrt(variance) - np.sqrt(max(lower_bound, 0.0))
+    message = ('optimal allocation found' if optimal
+               else f'time limit reached; best allocation is within {gap:.4%} volatility of optimal')
+    report(f"{message} after {nodes} nodes")
+    return OptimizeResult(x=x, fun=np.sqrt(variance), success=True, nodes=nodes, optimal=optimal,
+                          lower_bound=np.sqrt(max(lower_bound, 0.0)), gap=gap, message=message)
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+from trading_calendar import calendar_from_dir
 from datetime import datetime, timedelta
 
 # --- Configuration ---
@@ -22,22 +23,27 @@ print(f"Creating a synthetic data file for '{pseudo_ticker}' with a fixed {annua
 
 # --- Generate the Price History ---
 try:
-    # 1. Create a monthly date range for our history
-    # 'MS' stands for 'Month Start' frequency
-    date_range = pd.date_range(start=start_date, end=end_date, freq='MS')
-
-    # 2. Convert the annual return to an equivalent monthly return
-    # This is the key formula for the calculation
-    monthly_return = (1 + annual_return)**(1/12) - 1
-
-    # 3. Generate the price history by compounding the monthly return
-    prices = []
-    current_price = initial_price
-    for _ in date_range:
-        prices.append(current_price)
-        current_price *= (1 + monthly_return)
-
-    # 4. Create a pandas DataFrame in the correct format
+    # 1. Use the same dates as the files already in output_dir, so everything lines up.
+    # With no files yet, fall back to a monthly range ('MS' stands for 'Month Start').
+    existing_files = [f for f in os.listdir(output_dir) if f.endswith('.csv') and f != f"{pseudo_ticker}.csv"] if os.path.exists(output_dir) else []
+    if existing_files:
+        calendar = calendar_from_dir(output_dir)
+        if pseudo_ticker in calendar.names:
+            # Leave out this fund's own (old) file so its dates are not carried over
+            calendar.remove_series(pseudo_ticker)
+        date_range = calendar.index
+        date_range = date_range[(date_range >= start_date) & (date_range <= end_date)]
+    else:
+        date_range = pd.date_range(start=start_date, end=end_date, freq='MS')
+
+    # 2. Generate the price history by compounding the annual return over the time
+    # elapsed since the first date. This only ever grows, whatever the spacing of the
+    # dates (monthly, daily or an off-cycle row), and month-start dates stay within
+    # a rounding error of the old fixed monthly steps.
+    years_elapsed = (date_range - date_range[0]).days / 365.25
+    prices = initial_price * (1 + annual_return) ** np.asarray(years_elapsed, dtype=float)
+
+    # 3. Create a pandas DataFrame in the correct format
     final_data = pd.DataFrame(data=prices, index=date_range, columns=['Close'])
     final_data.index.name = 'Date'
 
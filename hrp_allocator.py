@@ -0,0 +1,133 @@
+import numpy as np
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+from scipy.optimize import OptimizeResult
+
+# --- ======================================================================= ---
+# --- HIERARCHICAL RISK PARITY (HRP) ALLOCATOR                               ---
+# --- ======================================================================= ---
+
+# HRP never inverts the covariance matrix, so it works on large or
+# ill-conditioned universes where the SLSQP mean-variance path breaks down:
+#   1. cluster the funds from the correlation distance sqrt((1 - corr) / 2)
+#   2. quasi-diagonalize: order the funds so that similar ones sit together
+#   3. recursive bisection: split the ordered list in halves and share the
+#      weight between the halves in inverse proportion to their variance
+#
+# Funds with (almost) no volatility, like the risk-free asset or a fixed-return
+# stable value fund, have no risk to share out, so they are left out of the
+# clustering (inverse-variance weighting would otherwise put nearly everything
+# in them). The risk-free asset is used to reach the target return instead, and
+# the others only receive their minimum allocation.
+
+riskless_volatility = 0.001   # annual volatility below 0.1% counts as riskless
+
+
+def _quasi_diagonal_order(cov):
+    std = np.sqrt(np.diag(cov))
+    corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+    distance = np.sqrt(np.clip(0.5 * (1.0 - corr), 0.0, None))
+    np.fill_diagonal(distance, 0.0)
+    # Single linkage is computed from the minimum spanning tree, O(n^2)
+    clusters = linkage(squareform(distance, checks=False), method='single')
+    return leaves_list(clusters)
+
+
+def _cluster_variance(cov, members):
+    sub_cov = cov[np.ix_(members, members)]
+    inverse_variance = 1.0 / np.diag(sub_cov)
+    w = inverse_variance / inverse_variance.sum()
+    return w @ sub_cov @ w
+
+
+def _recursive_bisection(cov, order):
+    weights = np.ones(len(cov))
+    clusters = [order]
+    while clusters:
+        next_clusters = []
+        for cluster in clusters:
+            if len(cluster) < 2:
+                continue
+            left, right = cluster[:len(cluster) // 2], cluster[len(cluster) // 2:]
+            left_variance, right_variance = _cluster_variance(cov, left), _cluster_variance(cov, right)
+            alpha = 1.0 - left_variance / (left_variance + right_variance)
+            weights[left] *= alpha
+            weights[right] *= 1.0 - alpha
+            next_clusters += [left, right]
+        clusters = next_clusters
+    return weights
+
+
+def hrp_weights(cov_matrix):
+    """HRP weights (summing to 1) for a covariance matrix of risky funds."""
+    cov = np.asarray(cov_matrix, dtype=float)
+    if len(cov) == 1:
+        return np.ones(1)
+    return _recursive_bisection(cov, _quasi_diagonal_order(cov))
+
+
+def apply_min_allocations(weights, min_weights):
+    """Raise weights to their minimums and scale the other funds down to stay fully invested."""
+    weights = np.asarray(weights, dtype=float).copy()
+    min_weights = np.asarray(min_weights, dtype=float)
+    fixed = np.zeros(len(weights), dtype=bool)
+    while True:
+        below = ~fixed & (weights < min_weights)
+        if not below.any():
+            return weights
+        fixed |= below
+        weights[fixed] = min_weights[fixed]
+        remaining = 1.0 - weights[fixed].sum()
+        free_total = weights[~fixed].sum()
+        if free_total > 0:
+            weights[~fixed] *= max(remaining, 0.0) / free_total
+
+
+def hrp_allocation(expected_returns, cov_matrix, target_return=None, risk_free_index=None, min_weights=None):
+    """HRP allocation over all funds, in the same shape as the optimizer's weights.
+
+    With a risk-free asset, the HRP portfolio of the risky funds is mixed with
+    it to hit target_return (as closely as the 0-100% mix allows), with the
+    minimum allocations applied. Returns a scipy OptimizeResult like minimize().
+    """
+    expected_returns = np.asarray(expected_returns, dtype=float)
+    cov = np.asarray(cov_matrix, dtype=float)
+    num_assets = len(expected_returns)
+    min_weights = np.zeros(num_assets) if min_weights is None else np.asarray(min_weights, dtype=float)
+
+    risky = np.diag(cov) > riskless_volatility ** 2
+    if risk_free_index is not None:
+        risky[risk_free_index] = False
+    if not risky.any():
+        return OptimizeResult(x=None, success=False, message='no funds with non-zero volatility to allocate')
+
+    weights = np.zeros(num_assets)
+    weights[risky] = hrp_weights(cov[np.ix_(risky, risky)])
+
+    if risk_free_index is not None and target_return is not None:
+        # Mix with the risk-free asset; the minimums move the return, so the risky
+        # share is found by bisection on the final (minimum-adjusted) allocation
+        hrp = weights.copy()
+
+        def mixed(risky_share):
+            w = hrp * risky_share
+            w[risk_free_index] = 1.0 - risky_share
+            return apply_min_allocations(w, min_weights)
+
+        low, high = 0.0, 1.0
+        increasing = mixed(1.0) @ expected_returns >= mixed(0.0) @ expected_returns
+        for _ in range(60):
+            mid = 0.5 * (low + high)
+            if (mixed(mid) @ expected_returns < target_return) == increasing:
+                low = mid
+            else:
+                high = mid
+        weights = mixed(0.5 * (low + high))
+    else:
+        weights = apply_min_allocations(weights, min_weights)
+
+    volatility = np.sqrt(weights @ cov @ weights)
+    message = 'HRP allocation'
+    if target_return is not None and abs(weights @ expected_returns - target_return) > 1e-4:
+        message += f' (expected return {weights @ expected_returns:.2%} differs from the {target_return:.2%} target)'
+    return OptimizeResult(x=weights, fun=volatility, success=True, message=message)
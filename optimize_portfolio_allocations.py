@@ -4,6 +4,12 @@ import os
 from scipy.optimize import minimize
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
+from trading_calendar import TradingCalendar, calendar_from_dir
+from snapshot_store import default_store_dir, load_snapshot_prices, snapshot_for_dir
+from hrp_allocator import hrp_allocation
+from cardinality_optimizer import solve_cardinality_constrained
+from stress_test import DEFAULT_STRESS_WINDOWS, portfolio_period_returns, run_stress_tests
+from results_store import open_results_db, record_run, export_summary_report, export_comparison_csv
 
 # --- ======================================================================= ---
 # --- STEP 1: DEFINE ALL YOUR SCENARIOS HERE                                  ---
@@ -39,54 +45,97 @@ SCENARIOS_TO_RUN = [
     #     'target_return': 0.08,
     #     'constraints': {}
     # }
+    #
+    # To hold at most k funds, add 'max_holdings' (and optionally a minimum
+    # position size for every fund that is held). Risk-Free counts as a fund.
+    # {
+    #     'name': 'Moderate_7_Percent_Max_5_Funds',
+    #     'target_return': 0.07,
+    #     'max_holdings': 5,
+    #     'min_position': 0.05,
+    #     'constraints': {'SPY': 0.13}
+    # }
+    #
+    # For large or ill-conditioned universes, use Hierarchical Risk Parity
+    # instead of mean-variance. It is mixed with Risk-Free to reach the target.
+    # {
+    #     'name': 'Moderate_7_Percent_HRP',
+    #     'target_return': 0.07,
+    #     'method': 'hrp',
+    #     'constraints': {'SPY': 0.13}
+    # }
+]
+
+# --- Stress Test Windows ---
+# Every successful scenario is tested against every window below in one batch.
+# Add custom date ranges as extra dictionaries, e.g.
+# {'name': 'Dot-Com Bust', 'start': '2000-03-01', 'end': '2002-10-31'}
+STRESS_WINDOWS = DEFAULT_STRESS_WINDOWS + [
 ]
 
 # --- General Configuration ---
 input_dir = 'stock_data_yfinance'
+# How to line up dates across files: 'intersection' (only dates every file has) or 'ffill'
+align_policy = 'intersection'
+# Set to a snapshot tag (see 'python snapshot_store.py list') to rerun on an old data vintage
+data_snapshot = None
 add_risk_free_asset = True
 risk_free_rate = 0.04
 initial_investment = 100000
+# Every run is appended here; the reports below are generated from this database
+results_db_path = os.path.join('reports', 'optimizer_results.sqlite')
+
+# --- Max-Holdings Scenarios (branch-and-bound) ---
+bnb_time_limit = 60     # seconds per scenario; the best allocation found so far is used after that
+bnb_workers = None      # worker processes; None uses every CPU core
 
 # --- ======================================================================= ---
 # --- (The rest of the script runs automatically based on the scenarios above) ---
 # --- ======================================================================= ---
 
+# --- Optimization Functions ---
+def portfolio_std_dev(weights, cov_matrix): return np.sqrt(weights.T @ cov_matrix @ weights)
+def portfolio_return(weights, expected_returns): return np.sum(weights * expected_returns)
+def objective_function(weights, cov_matrix): return portfolio_std_dev(weights, cov_matrix)
+
+
 # --- Data Loading and Prep (Done once at the start) ---
-if not os.path.exists(input_dir):
-    print(f"Error: Directory '{input_dir}' not found. Please run the data prep script.")
-    exit()
-
-all_prices = {}
-tickers_from_files = []
-print(f"Reading data from '{input_dir}' directory...")
-for filename in os.listdir(input_dir):
-    if filename.endswith('.csv'):
-        ticker = filename.split('.')[0]
-        tickers_from_files.append(ticker)
-        file_path = os.path.join(input_dir, filename)
-        df = pd.read_csv(file_path, index_col='Date', parse_dates=True)
-        all_prices[ticker] = df['Close']
-
-price_df = pd.DataFrame(all_prices)
-price_df = price_df.dropna()
-log_returns_risky = np.log(price_df / price_df.shift(1)).dropna()
-
-# --- Main Processing Loop ---
-summary_results_for_csv = []
-main_reports_dir = 'reports'
-os.makedirs(main_reports_dir, exist_ok=True)
-
-for scenario in SCENARIOS_TO_RUN:
-    scenario_name = scenario['name']
-    target_return = scenario['target_return']
-    min_allocation_constraints = scenario['constraints']
+def current_data_vintage(input_dir, data_snapshot=None):
+    # Snapshot tag of the data a run uses, stored with the run. For the live directory
+    # this reuses the snapshot with the same contents, or takes one (unchanged chunks are free).
+    if data_snapshot:
+        return data_snapshot
+    return snapshot_for_dir(input_dir, note='taken by optimizer run')['tag']
+
 
-    print(f"\n{'='*60}\nRunning Scenario: {scenario_name}\n{'='*60}")
+def load_price_data(input_dir, data_snapshot=None):
+    if data_snapshot:
+        print(f"Reading data from snapshot '{data_snapshot}' in '{default_store_dir}'...")
+        calendar = TradingCalendar(load_snapshot_prices(data_snapshot))
+        data_vintage = data_snapshot
+    else:
+        if not os.path.exists(input_dir):
+            print(f"Error: Directory '{input_dir}' not found. Please run the data prep script.")
+            exit()
+        data_vintage = current_data_vintage(input_dir)
+        print(f"Reading data from '{input_dir}' directory (snapshot '{data_vintage}')...")
+        calendar = calendar_from_dir(input_dir)
 
-    # --- Prepare Data for this specific scenario ---
+    price_df = calendar.to_frame(policy=align_policy)
+    return price_df, list(calendar.names), data_vintage
+
+
+def log_returns_from_prices(price_df):
+    return pd.DataFrame(np.diff(np.log(price_df.values), axis=0), index=price_df.index[1:], columns=price_df.columns)
+
+
+def prepare_optimizer_inputs(log_returns_risky, tickers_from_files, expected_returns=None, cov_matrix=None):
+    # Watch mode passes in annualized statistics it keeps up to date incrementally
     tickers = tickers_from_files.copy()
-    expected_returns = log_returns_risky.mean() * 12
-    cov_matrix = log_returns_risky.cov() * 12
+    if expected_returns is None:
+        expected_returns = log_returns_risky.mean() * 12
+    if cov_matrix is None:
+        cov_matrix = log_returns_risky.cov() * 12
     num_risky_assets = len(tickers)
 
     if add_risk_free_asset:
@@ -96,11 +145,20 @@ for scenario in SCENARIOS_TO_RUN:
         new_cov_matrix = np.zeros((num_risky_assets + 1, num_risky_assets + 1))
         new_cov_matrix[:num_risky_assets, :num_risky_assets] = cov_matrix.values
         cov_matrix = pd.DataFrame(new_cov_matrix, index=tickers, columns=tickers)
+    return tickers, expected_returns, cov_matrix
 
-    # --- Optimization Functions ---
-    def portfolio_std_dev(weights, cov_matrix): return np.sqrt(weights.T @ cov_matrix @ weights)
-    def portfolio_return(weights, expected_returns): return np.sum(weights * expected_returns)
-    def objective_function(weights, cov_matrix): return portfolio_std_dev(weights, cov_matrix)
+
+# --- Run the Optimizer for One Scenario ---
+def allocation_method(scenario):
+    # Stored with every result: 'hrp', 'max_holdings' (branch-and-bound) or 'mean_variance' (SLSQP)
+    if scenario.get('method') == 'hrp':
+        return 'hrp'
+    return 'max_holdings' if scenario.get('max_holdings') else 'mean_variance'
+
+
+def optimize_scenario(scenario, tickers, expected_returns, cov_matrix, initial_weights=None):
+    target_return = scenario['target_return']
+    min_allocation_constraints = scenario['constraints']
 
     # --- Set Up Constraints ---
     num_assets = len(tickers)
@@ -108,6 +166,7 @@ for scenario in SCENARIOS_TO_RUN:
         {'type': 'eq', 'fun': lambda weights: portfolio_return(weights, expected_returns) - target_return},
         {'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1}
     ]
+    min_weights = np.zeros(num_assets)
     if min_allocation_constraints:
         print("\nApplying minimum allocation constraints:")
         for ticker, min_percentage in min_allocation_constraints.items():
@@ -116,117 +175,185 @@ for scenario in SCENARIOS_TO_RUN:
                 print(f"  - Minimum {min_percentage:.0%} for {ticker}")
                 def make_constraint(i, p): return lambda w: w[i] - p
                 cons.append({'type': 'ineq', 'fun': make_constraint(idx, min_percentage)})
+                min_weights[idx] = min_percentage
             except ValueError:
                 print(f"  - Warning: Constrained ticker '{ticker}' not found. Constraint ignored.")
 
+    # --- HRP Mode: no optimizer and no matrix inversion ---
+    if allocation_method(scenario) == 'hrp':
+        print("\nAllocating with Hierarchical Risk Parity:")
+        result = hrp_allocation(
+            np.asarray(expected_returns), np.asarray(cov_matrix), target_return,
+            risk_free_index=tickers.index('Risk-Free') if add_risk_free_asset else None, min_weights=min_weights)
+        print(f"  - {result.message}")
+        return result
+
+    # --- Max-Holdings Mode: exact branch-and-bound over the same problem ---
+    if allocation_method(scenario) == 'max_holdings':
+        min_position = scenario.get('min_position', 0.0)
+        print(f"\nSolving for at most {scenario['max_holdings']} funds"
+              + (f", each at least {min_position:.0%}" if min_position else "") + ":")
+        return solve_cardinality_constrained(
+            np.asarray(expected_returns), np.asarray(cov_matrix), target_return, scenario['max_holdings'],
+            min_position=min_position, min_weights=min_weights,
+            time_limit=scenario.get('time_limit', bnb_time_limit), workers=bnb_workers)
+
     bounds = tuple((0, 1) for _ in range(num_assets))
-    initial_weights = np.array([1/num_assets] * num_assets)
+    # Watch mode warm-starts from the previous solution
+    if initial_weights is None or len(initial_weights) != num_assets:
+        initial_weights = np.array([1/num_assets] * num_assets)
     
     # --- Run Optimization ---
-    optimization_result = minimize(fun=objective_function, x0=initial_weights, args=(cov_matrix,), method='SLSQP', bounds=bounds, constraints=tuple(cons))
-
-    # --- Generate Reports if Successful ---
-    if optimization_result.success:
-        print(f"\nOptimization for '{scenario_name}' SUCCEEDED.")
-        optimal_weights = optimization_result.x
-        
-        # --- Create Scenario Subdirectory ---
-        scenario_dir = os.path.join(main_reports_dir, scenario_name)
-        os.makedirs(scenario_dir, exist_ok=True)
-        
-        # --- Calculations for Reports ---
-        optimal_portfolio_return = portfolio_return(optimal_weights, expected_returns)
-        optimal_portfolio_volatility = portfolio_std_dev(optimal_weights, cov_matrix)
-        
-        risky_weights = optimal_weights[:num_risky_assets]
-        risk_free_weight = optimal_weights[num_risky_assets] if add_risk_free_asset else 0
-        risk_free_monthly_return = (1 + risk_free_rate)**(1/12) - 1 if add_risk_free_asset else 0
-        risky_returns_values = np.exp(log_returns_risky.dot(risky_weights)).values - 1
-        total_returns_values = risky_returns_values + (risk_free_weight * risk_free_monthly_return)
-        portfolio_total_simple_returns = pd.Series(total_returns_values, index=log_returns_risky.index)
-        
-        portfolio_cumulative_growth = (1 + portfolio_total_simple_returns).cumprod() * initial_investment
-        
-        portfolio_total_simple_returns.index = pd.to_datetime(portfolio_total_simple_returns.index, utc=True)
-        annual_returns = portfolio_total_simple_returns.resample('YE').apply(lambda x: (1 + x).prod() - 1)
-        annual_returns_df = pd.DataFrame(annual_returns)
-        annual_returns_df.index = annual_returns_df.index.year
-        annual_returns_df.columns = ['Annual Return']
-        
-        running_max = portfolio_cumulative_growth.cummax()
-        drawdowns = (portfolio_cumulative_growth - running_max) / running_max
-        max_drawdown = drawdowns.min()
-
-        one_std_lower, one_std_upper = optimal_portfolio_return - optimal_portfolio_volatility, optimal_portfolio_return + optimal_portfolio_volatility
-        two_std_lower, two_std_upper = optimal_portfolio_return - 2 * optimal_portfolio_volatility, optimal_portfolio_return + 2 * optimal_portfolio_volatility
-
-        # --- Generate and Save Plot ---
-        plt.style.use('seaborn-v0_8-whitegrid')
-        fig, ax = plt.subplots(figsize=(12, 8))
-        ax.plot(portfolio_cumulative_growth.index, portfolio_cumulative_growth.values)
-        ax.set_title(f'Growth of ${initial_investment:,.0f} - Scenario: {scenario_name}', fontsize=16)
-        ax.set_ylabel('Portfolio Value'); ax.set_xlabel('Date')
-        ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-        plot_path = os.path.join(scenario_dir, 'portfolio_growth_chart.png')
-        plt.savefig(plot_path); plt.close(fig)
-        
-        # --- Generate and Save Text Report ---
-        report_text = f"""
-==================================================
-SUMMARY REPORT FOR SCENARIO: {scenario_name}
-==================================================
-
-Optimal Portfolio for a Target Return of {target_return:.2%}
---------------------------------------------------
-"""
-        for i, t in enumerate(tickers): report_text += f"  Allocation for {t}: {max(0, optimal_weights[i]):.2%}\n"
-        report_text += f"""--------------------------------------------------
-Expected Annual Return: {optimal_portfolio_return:.2%}
-Lowest Possible Annual Volatility: {optimal_portfolio_volatility:.2%}
---------------------------------------------------
-
-Statistical Projections (Forward-Looking)
---------------------------------------------------
-68% Confidence Interval (1 Std. Dev.):
-  The annual return is expected to be between {one_std_lower:.2%} and {one_std_upper:.2%}.
-
-95% Confidence Interval (2 Std. Dev.):
-  The annual return is expected to be between {two_std_lower:.2%} and {two_std_upper:.2%}.
-
---- Historical Performance Analysis (Backward-Looking) ---
-
-Portfolio Annual Returns:
-{annual_returns_df.to_string(formatters={'Annual Return': '{:,.2%}'.format})}
-
-Maximum Drawdown (since {price_df.index.min().year}): {max_drawdown:.2%}
---------------------------------------------------
-"""
-        report_path = os.path.join(scenario_dir, 'summary_report.txt')
-        with open(report_path, 'w') as f: f.write(report_text)
-        print(f"-> Saved individual report and plot to '{scenario_dir}'")
-        
-        # --- Collect data for the final summary CSV ---
-        summary_data_row = {'Scenario': scenario_name, 'Target Return': target_return, 'Volatility (Std Dev)': optimal_portfolio_volatility}
-        for i, t in enumerate(tickers): summary_data_row[f'Allocation: {t}'] = optimal_weights[i]
-        summary_data_row['Max Drawdown'] = max_drawdown
-        summary_data_row['2008 Return'] = annual_returns_df.loc[2008, 'Annual Return'] if 2008 in annual_returns_df.index else 'N/A'
-        summary_data_row['95% Lower Bound'] = two_std_lower
-        summary_data_row['95% Upper Bound'] = two_std_upper
-        summary_results_for_csv.append(summary_data_row)
-        
-    else:
-        print(f"Optimization for '{scenario_name}' FAILED. Message: {optimization_result.message}")
+    return minimize(fun=objective_function, x0=initial_weights, args=(cov_matrix,), method='SLSQP', bounds=bounds, constraints=tuple(cons))
+
 
-# --- Generate Final Comparison CSV ---
-if summary_results_for_csv:
-    summary_df = pd.DataFrame(summary_results_for_csv)
-    summary_df.set_index('Scenario', inplace=True)
+# --- Calculations, Plot and Numeric Results for One Scenario ---
+def analyze_scenario(scenario, optimization_result, tickers, expected_returns, cov_matrix, log_returns_risky, main_reports_dir):
+    scenario_name = scenario['name']
+    optimal_weights = optimization_result.x
+    num_risky_assets = log_returns_risky.shape[1]
+
+    # --- Create Scenario Subdirectory ---
+    scenario_dir = os.path.join(main_reports_dir, scenario_name)
+    os.makedirs(scenario_dir, exist_ok=True)
+    
+    # --- Calculations for Reports ---
+    optimal_portfolio_return = portfolio_return(optimal_weights, expected_returns)
+    optimal_portfolio_volatility = portfolio_std_dev(optimal_weights, cov_matrix)
+    
+    risky_weights = optimal_weights[:num_risky_assets]
+    risk_free_weight = optimal_weights[num_risky_assets] if add_risk_free_asset else 0
+    risk_free_monthly_return = (1 + risk_free_rate)**(1/12) - 1 if add_risk_free_asset else 0
+    risky_returns_values = np.exp(log_returns_risky.dot(risky_weights)).values - 1
+    total_returns_values = risky_returns_values + (risk_free_weight * risk_free_monthly_return)
+    portfolio_total_simple_returns = pd.Series(total_returns_values, index=log_returns_risky.index)
     
-    # Format columns for better readability
-    for col in summary_df.columns:
-        if 'Allocation' in col or 'Return' in col or 'Bound' in col or 'Drawdown' in col or 'Volatility' in col:
-            summary_df[col] = summary_df[col].apply(lambda x: f"{x:.2%}" if isinstance(x, (int, float)) else x)
-            
+    portfolio_cumulative_growth = (1 + portfolio_total_simple_returns).cumprod() * initial_investment
+    
+    # Dates are already normalized by the trading calendar, so group straight on the year
+    annual_returns = (1 + portfolio_total_simple_returns).groupby(portfolio_total_simple_returns.index.year).prod() - 1
+    annual_returns_df = pd.DataFrame(annual_returns)
+    annual_returns_df.columns = ['Annual Return']
+    
+    running_max = portfolio_cumulative_growth.cummax()
+    drawdowns = (portfolio_cumulative_growth - running_max) / running_max
+    max_drawdown = drawdowns.min()
+
+    one_std_lower, one_std_upper = optimal_portfolio_return - optimal_portfolio_volatility, optimal_portfolio_return + optimal_portfolio_volatility
+    two_std_lower, two_std_upper = optimal_portfolio_return - 2 * optimal_portfolio_volatility, optimal_portfolio_return + 2 * optimal_portfolio_volatility
+
+    # --- Generate and Save Plot ---
+    plt.style.use('seaborn-v0_8-whitegrid')
+    fig, ax = plt.subplots(figsize=(12, 8))
+    ax.plot(portfolio_cumulative_growth.index, portfolio_cumulative_growth.values)
+    ax.set_title(f'Growth of ${initial_investment:,.0f} - Scenario: {scenario_name}', fontsize=16)
+    ax.set_ylabel('Portfolio Value'); ax.set_xlabel('Date')
+    ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+    plot_path = os.path.join(scenario_dir, 'portfolio_growth_chart.png')
+    plt.savefig(plot_path); plt.close(fig)
+    
+    # --- Max-holdings scenarios also record the limits and how far the search got ---
+    solver_details = {}
+    if allocation_method(scenario) == 'max_holdings':
+        solver_details = {
+            'max_holdings': scenario['max_holdings'], 'min_position': scenario.get('min_position', 0.0),
+            'optimal': optimization_result.optimal, 'gap': optimization_result.gap,
+            'lower_bound': optimization_result.lower_bound,
+        }
+
+    # --- Collect numeric results for the results store ---
+    # The text report and the comparison CSV are rendered from the store.
+    return {
+        'scenario': scenario_name,
+        'method': allocation_method(scenario),
+        'target_return': scenario['target_return'],
+        'expected_return': optimal_portfolio_return,
+        'volatility': optimal_portfolio_volatility,
+        'max_drawdown': max_drawdown,
+        'lower_68': one_std_lower, 'upper_68': one_std_upper,
+        'lower_95': two_std_lower, 'upper_95': two_std_upper,
+        'return_2008': annual_returns_df.loc[2008, 'Annual Return'] if 2008 in annual_returns_df.index else None,
+        'tickers': tickers,
+        'weights': optimal_weights,
+        'constraints': scenario['constraints'],
+        'annual_returns': annual_returns_df['Annual Return'].to_dict(),
+        'scenario_dir': scenario_dir,
+        **solver_details,
+    }
+
+
+# --- Historical Stress Tests (all scenarios x all windows in one batch) ---
+def add_stress_tests(scenario_results, log_returns_risky):
+    num_risky_assets = log_returns_risky.shape[1]
+    all_weights = np.array([result['weights'] for result in scenario_results])
+    stress_returns = portfolio_period_returns(
+        log_returns_risky, all_weights[:, :num_risky_assets],
+        all_weights[:, num_risky_assets] if add_risk_free_asset else None,
+        (1 + risk_free_rate)**(1/12) - 1 if add_risk_free_asset else 0)
+    stress_df = run_stress_tests(log_returns_risky.index, stress_returns, STRESS_WINDOWS,
+                                 portfolio_names=[result['scenario'] for result in scenario_results])
+    for result in scenario_results:
+        result['stress_tests'] = stress_df[stress_df['portfolio'] == result['scenario']].to_dict('records')
+
+
+# --- Save Results and Generate Reports from the Store ---
+def save_and_report(scenario_results, price_df, main_reports_dir, data_vintage=None, report_scenarios=None):
+    # Every result is recorded; summary reports are only rewritten for report_scenarios (default: all)
+    conn = open_results_db(results_db_path)
+    run_id, result_ids = record_run(conn, {
+        'input_dir': f"{default_store_dir}@{data_snapshot}" if data_snapshot else input_dir,
+        'data_snapshot': data_vintage,
+        'data_start': price_df.index.min().strftime('%Y-%m-%d'),
+        'data_end': price_df.index.max().strftime('%Y-%m-%d'),
+        'risk_free_rate': risk_free_rate if add_risk_free_asset else None,
+        'initial_investment': initial_investment,
+    }, scenario_results)
+
+    scenario_dirs = {result['scenario']: result['scenario_dir'] for result in scenario_results}
+    for scenario_name, result_id in result_ids.items():
+        if report_scenarios is not None and scenario_name not in report_scenarios:
+            continue
+        report_path = os.path.join(scenario_dirs[scenario_name], 'summary_report.txt')
+        export_summary_report(conn, result_id, report_path)
+        print(f"-> Saved individual report and plot to '{scenario_dirs[scenario_name]}'")
+
     summary_csv_path = os.path.join(main_reports_dir, 'scenarios_comparison_summary.csv')
-    summary_df.to_csv(summary_csv_path)
-    print(f"\n{'='*60}\nMaster comparison report saved to: {summary_csv_path}\n{'='*60}")
\ No newline at end of file
+    export_comparison_csv(conn, run_id, summary_csv_path)
+    conn.close()
+    print(f"\n{'='*60}\nRun {run_id} saved to results database: {results_db_path}")
+    print(f"Master comparison report saved to: {summary_csv_path}\n{'='*60}")
+
+
+def main():
+    price_df, tickers_from_files, data_vintage = load_price_data(input_dir, data_snapshot)
+    log_returns_risky = log_returns_from_prices(price_df)
+
+    # --- Main Processing Loop ---
+    scenario_results = []
+    main_reports_dir = 'reports'
+    os.makedirs(main_reports_dir, exist_ok=True)
+
+    for scenario in SCENARIOS_TO_RUN:
+        scenario_name = scenario['name']
+        print(f"\n{'='*60}\nRunning Scenario: {scenario_name}\n{'='*60}")
+
+        # --- Prepare Data for this specific scenario ---
+        tickers, expected_returns, cov_matrix = prepare_optimizer_inputs(log_returns_risky, tickers_from_files)
+        optimization_result = optimize_scenario(scenario, tickers, expected_returns, cov_matrix)
+
+        # --- Generate Reports if Successful ---
+        if optimization_result.success:
+            print(f"\nOptimization for '{scenario_name}' SUCCEEDED.")
+            scenario_results.append(analyze_scenario(
+                scenario, optimization_result, tickers, expected_returns, cov_matrix, log_returns_risky, main_reports_dir))
+        else:
+            print(f"Optimization for '{scenario_name}' FAILED. Message: {optimization_result.message}")
+
+    if scenario_results:
+        add_stress_tests(scenario_results, log_returns_risky)
+        save_and_report(scenario_results, price_df, main_reports_dir, data_vintage)
+
+
+# Worker processes (max-holdings scenarios) re-import this file, so only run from the command line
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import yfinance as yf
 import pandas as pd
 import os
+from trading_calendar import TradingCalendar, normalize_index
+from snapshot_store import create_snapshot
 from datetime import datetime, timedelta
 
 # --- MASTER CONFIGURATION ---
@@ -23,9 +25,9 @@ for ticker in public_tickers:
         ticker_obj = yf.Ticker(ticker)
         data = ticker_obj.history(start=start_date, end=end_date, interval='1mo', auto_adjust=True)
         
-        # <<< FIX #1: REMOVE TIMEZONE INFORMATION >>>
+        # <<< FIX #1: NORMALIZE THE DATES (NO TIMEZONE, NO TIME OF DAY) >>>
         # This makes the index 'timezone-naive' so it can match our generated files.
-        data.index = data.index.tz_localize(None)
+        data.index = normalize_index(data.index).rename('Date')
 
         if not data.empty:
             if reference_index is None:
@@ -48,15 +50,15 @@ try:
     pseudo_ticker_balanced = 'BOEING_BALANCED_70_30'
     blend_components = {'SPY': 0.45, 'QQQ': 0.25, 'AGG': 0.30}
     component_data = yf.download(list(blend_components.keys()), start=start_date, end=end_date, interval='1mo', auto_adjust=True)['Close']
-    component_data.index = component_data.index.tz_localize(None) # Remove timezone here too
+    component_data.index = normalize_index(component_data.index) # Same date normalization here too
     
     monthly_returns = component_data.pct_change()
     blended_returns = (monthly_returns * list(blend_components.values())).sum(axis=1)
     blended_price_index = (1 + blended_returns).cumprod()
     blended_price_index = blended_price_index.ffill() * 1.0
     final_data_balanced = blended_price_index.to_frame(name='Close')
-    # Reindex to match the reference index perfectly, filling any gaps
-    final_data_balanced = final_data_balanced.reindex(reference_index, method='ffill') 
+    # Put it on the reference calendar, carrying the last value into any gaps
+    final_data_balanced = TradingCalendar.from_index(reference_index).conform(final_data_balanced['Close']).to_frame(name='Close')
     final_data_balanced.to_csv(os.path.join(output_dir, f"{pseudo_ticker_balanced}.csv"))
     print(f"Successfully created {pseudo_ticker_balanced}.csv")
 except Exception as e:
@@ -78,6 +80,15 @@ try:
 except Exception as e:
     print(f"ERROR creating fixed income fund: {e}")
 
+# --- 4. SAVE A SNAPSHOT OF THIS DATA VINTAGE ---
+# Only the chunks that changed since the last snapshot take up new space.
+print("\n--- Part 4: Saving Data Snapshot ---")
+try:
+    snapshot = create_snapshot(output_dir, note='prepare_all_data_for_optimizer.py')
+    print(f"Saved snapshot '{snapshot['tag']}'. Set data_snapshot = '{snapshot['tag']}' in the optimizer to reuse this exact data.")
+except Exception as e:
+    print(f"ERROR saving snapshot: {e}")
+
 print("\n------------------------------------")
 print("All data preparation is complete.")
 print("You can now run the portfolio optimizer without errors.")
\ No newline at end of file
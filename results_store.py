@@ -0,0 +1,386 @@
+import sqlite3
+import os
+from datetime import datetime
+import pandas as pd
+from stress_test import STRESS_COLUMNS
+
+# --- ======================================================================= ---
+# --- RESULTS STORE: every optimizer run is appended to one SQLite database  ---
+# --- ======================================================================= ---
+
+# All numbers are stored as plain REALs (0.05 means 5%). Every run records the tag
+# of the price data snapshot it used (see snapshot_store.py), so any stored result
+# can be traced back to, and rerun on, its exact data. The comparison CSV and
+# the per-scenario summary_report.txt files are rendered from this database, so
+# the database is the source of truth and the reports are just views of it.
+
+default_db_path = os.path.join('reports', 'optimizer_results.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id             INTEGER PRIMARY KEY,
+    created_at         TEXT NOT NULL,
+    input_dir          TEXT,
+    data_snapshot      TEXT,
+    data_start         TEXT,
+    data_end           TEXT,
+    risk_free_rate     REAL,
+    initial_investment REAL
+);
+CREATE TABLE IF NOT EXISTS scenario_results (
+    result_id       INTEGER PRIMARY KEY,
+    run_id          INTEGER NOT NULL REFERENCES runs(run_id),
+    scenario        TEXT NOT NULL,
+    method          TEXT,
+    target_return   REAL,
+    expected_return REAL,
+    volatility      REAL,
+    max_drawdown    REAL,
+    lower_68        REAL,
+    upper_68        REAL,
+    lower_95        REAL,
+    upper_95        REAL,
+    return_2008     REAL,
+    max_holdings    INTEGER,
+    min_position    REAL,
+    optimal         INTEGER,
+    gap             REAL,
+    lower_bound     REAL
+);
+CREATE TABLE IF NOT EXISTS scenario_constraints (
+    result_id  INTEGER NOT NULL REFERENCES scenario_results(result_id),
+    ticker     TEXT NOT NULL,
+    min_weight REAL NOT NULL,
+    PRIMARY KEY (result_id, ticker)
+);
+CREATE TABLE IF NOT EXISTS allocations (
+    result_id INTEGER NOT NULL REFERENCES scenario_results(result_id),
+    position  INTEGER NOT NULL,
+    ticker    TEXT NOT NULL,
+    weight    REAL NOT NULL,
+    PRIMARY KEY (result_id, ticker)
+);
+CREATE TABLE IF NOT EXISTS annual_returns (
+    result_id     INTEGER NOT NULL REFERENCES scenario_results(result_id),
+    year          INTEGER NOT NULL,
+    annual_return REAL NOT NULL,
+    PRIMARY KEY (result_id, year)
+);
+CREATE TABLE IF NOT EXISTS stress_results (
+    result_id           INTEGER NOT NULL REFERENCES scenario_results(result_id),
+    position            INTEGER NOT NULL,
+    window              TEXT NOT NULL,
+    window_start        TEXT NOT NULL,
+    window_end          TEXT NOT NULL,
+    total_return        REAL,
+    peak_to_trough      REAL,
+    recovery_periods    REAL,
+    worst_period_return REAL,
+    PRIMARY KEY (result_id, window)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs(created_at);
+CREATE INDEX IF NOT EXISTS idx_results_scenario ON scenario_results(scenario, run_id);
+CREATE INDEX IF NOT EXISTS idx_results_run ON scenario_results(run_id);
+CREATE INDEX IF NOT EXISTS idx_allocations_ticker ON allocations(ticker, result_id);
+CREATE INDEX IF NOT EXISTS idx_stress_window ON stress_results(window, result_id);
+"""
+
+# Columns of scenario_results, in insert order (everything except the ids)
+RESULT_COLUMNS = [
+    'scenario', 'method', 'target_return', 'expected_return', 'volatility', 'max_drawdown',
+    'lower_68', 'upper_68', 'lower_95', 'upper_95', 'return_2008',
+    # Max-holdings scenarios only (NULL otherwise): the limits and the branch-and-bound
+    # outcome. optimal is 0 if the time limit stopped the search; gap and lower_bound
+    # are in annual volatility.
+    'max_holdings', 'min_position', 'optimal', 'gap', 'lower_bound',
+]
+
+# How the allocation was made: 'mean_variance' (SLSQP), 'max_holdings' (branch-and-bound) or 'hrp'
+TEXT_RESULT_COLUMNS = {'scenario', 'method'}
+
+
+def open_results_db(db_path=default_db_path):
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _to_sql_value(value):
+    # numpy scalars -> python floats, missing values -> NULL
+    if value is None:
+        return None
+    value = float(value)
+    return None if value != value else value
+
+
+# --- Writing ---
+
+def record_run(conn, run_info, scenario_results):
+    """Append one optimizer run and all of its scenario results in a single transaction.
+
+    run_info is a dict with the keys of the runs table (created_at defaults to now).
+    Each scenario result is a dict with the RESULT_COLUMNS keys (missing ones are
+    stored as NULL) plus 'tickers', 'weights', 'constraints' ({ticker: min_weight}),
+    'annual_returns' ({year: return}) and optionally 'stress_tests' (list of dicts
+    with the stress_results columns).
+    Returns (run_id, {scenario_name: result_id}).
+    """
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO runs (created_at, input_dir, data_snapshot, data_start, data_end, risk_free_rate, initial_investment) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_info.get('created_at') or datetime.now().isoformat(timespec='seconds'),
+             run_info.get('input_dir'),
+             run_info.get('data_snapshot'),
+             run_info.get('data_start'),
+             run_info.get('data_end'),
+             _to_sql_value(run_info.get('risk_free_rate')),
+             _to_sql_value(run_info.get('initial_investment'))))
+        run_id = cur.lastrowid
+
+        # Assign result ids up front so every child table can go in with one executemany
+        first_id = conn.execute("SELECT COALESCE(MAX(result_id), 0) + 1 FROM scenario_results").fetchone()[0]
+        result_ids = {}
+        result_rows, constraint_rows, allocation_rows, annual_rows, stress_rows = [], [], [], [], []
+        for offset, result in enumerate(scenario_results):
+            result_id = first_id + offset
+            result_ids[result['scenario']] = result_id
+            result_rows.append((result_id, run_id) + tuple(
+                result.get(col) if col in TEXT_RESULT_COLUMNS else _to_sql_value(result.get(col))
+                for col in RESULT_COLUMNS))
+            for ticker, min_weight in (result.get('constraints') or {}).items():
+                constraint_rows.append((result_id, ticker, float(min_weight)))
+            for position, (ticker, weight) in enumerate(zip(result['tickers'], result['weights'])):
+                allocation_rows.append((result_id, position, ticker, float(weight)))
+            for year, annual_return in (result.get('annual_returns') or {}).items():
+                annual_rows.append((result_id, int(year), float(annual_return)))
+            for position, stress in enumerate(result.get('stress_tests') or []):
+                stress_rows.append((result_id, position, stress['window'], stress['window_start'], stress['window_end'])
+                                   + tuple(_to_sql_value(stress[col]) for col in STRESS_COLUMNS))
+
+        placeholders = ', '.join(['?'] * (len(RESULT_COLUMNS) + 2))
+        conn.executemany(
+            f"INSERT INTO scenario_results (result_id, run_id, {', '.join(RESULT_COLUMNS)}) VALUES ({placeholders})",
+            result_rows)
+        conn.executemany("INSERT INTO scenario_constraints VALUES (?, ?, ?)", constraint_rows)
+        conn.executemany("INSERT INTO allocations VALUES (?, ?, ?, ?)", allocation_rows)
+        conn.executemany("INSERT INTO annual_returns VALUES (?, ?, ?)", annual_rows)
+        conn.executemany("INSERT INTO stress_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", stress_rows)
+    return run_id, result_ids
+
+
+# --- Querying ---
+
+def _history_filters(scenario=None, start=None, end=None, ticker=None):
+    # created_at is an ISO timestamp, so a plain date as end means "up to the end of that day"
+    clauses, params = [], []
+    if scenario is not None:
+        clauses.append("r.scenario = ?"); params.append(scenario)
+    if start is not None:
+        clauses.append("u.created_at >= ?"); params.append(pd.Timestamp(start).isoformat(timespec='seconds'))
+    if end is not None:
+        end = pd.Timestamp(end)
+        if end == end.normalize():
+            clauses.append("u.created_at < ?"); params.append((end + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+        else:
+            clauses.append("u.created_at <= ?"); params.append(end.isoformat(timespec='seconds'))
+    if ticker is not None:
+        clauses.append("a.ticker = ?"); params.append(ticker)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def query_run_history(conn, scenario=None, start=None, end=None):
+    """One row per (run, scenario) with all numeric metrics, oldest run first."""
+    where, params = _history_filters(scenario, start, end)
+    sql = f"""
+        SELECT u.run_id, u.created_at, u.data_snapshot, r.result_id, r.{', r.'.join(RESULT_COLUMNS)}
+        FROM scenario_results r JOIN runs u ON u.run_id = r.run_id
+        {where}
+        ORDER BY u.created_at, r.result_id
+    """
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def query_allocations(conn, scenario=None, start=None, end=None, ticker=None):
+    """Long-format allocation history: one row per (run, scenario, ticker).
+
+    Comparing two periods is just a date filter, e.g.
+    query_allocations(conn, scenario='Moderate_7_Percent', start='2025-01-01').
+    """
+    where, params = _history_filters(scenario, start, end, ticker)
+    sql = f"""
+        SELECT u.run_id, u.created_at, r.scenario, a.ticker, a.weight
+        FROM allocations a
+        JOIN scenario_results r ON r.result_id = a.result_id
+        JOIN runs u ON u.run_id = r.run_id
+        {where}
+        ORDER BY u.created_at, r.result_id, a.position
+    """
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def query_annual_returns(conn, result_id):
+    sql = "SELECT year, annual_return FROM annual_returns WHERE result_id = ? ORDER BY year"
+    return pd.read_sql_query(sql, conn, params=(result_id,))
+
+
+def query_stress_results(conn, scenario=None, window=None, start=None, end=None):
+    """Stress-test history: one row per (run, scenario, stress window)."""
+    where, params = _history_filters(scenario, start, end)
+    if window is not None:
+        where = f"{where} AND s.window = ?" if where else "WHERE s.window = ?"
+        params.append(window)
+    sql = f"""
+        SELECT u.run_id, u.created_at, r.scenario, s.window, s.window_start, s.window_end,
+               s.{', s.'.join(STRESS_COLUMNS)}
+        FROM stress_results s
+        JOIN scenario_results r ON r.result_id = s.result_id
+        JOIN runs u ON u.run_id = r.run_id
+        {where}
+        ORDER BY u.created_at, r.result_id, s.position
+    """
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+# --- Views (the CSV and text reports) ---
+
+def export_comparison_csv(conn, run_id, csv_path):
+    """Write the scenarios comparison CSV for one run, formatted for spreadsheets."""
+    results = pd.read_sql_query(
+        f"SELECT result_id, {', '.join(RESULT_COLUMNS)} FROM scenario_results WHERE run_id = ? ORDER BY result_id",
+        conn, params=(run_id,))
+    allocations = pd.read_sql_query(
+        "SELECT a.result_id, a.position, a.ticker, a.weight FROM allocations a "
+        "JOIN scenario_results r ON r.result_id = a.result_id WHERE r.run_id = ?",
+        conn, params=(run_id,))
+    ticker_order = allocations.groupby('ticker')['position'].min().sort_values().index
+    allocation_wide = allocations.pivot(index='result_id', columns='ticker', values='weight')[ticker_order]
+    allocation_wide.columns = [f'Allocation: {t}' for t in allocation_wide.columns]
+
+    stress = pd.read_sql_query(
+        "SELECT s.result_id, s.position, s.window, s.peak_to_trough FROM stress_results s "
+        "JOIN scenario_results r ON r.result_id = s.result_id WHERE r.run_id = ?",
+        conn, params=(run_id,))
+    window_order = stress.groupby('window')['position'].min().sort_values().index
+    stress_wide = stress.pivot(index='result_id', columns='window', values='peak_to_trough')[window_order]
+    stress_wide.columns = [f'Stress Loss: {w}' for w in stress_wide.columns]
+
+    summary_df = results.set_index('result_id')
+    summary_df = summary_df[['scenario', 'target_return', 'volatility']].join(allocation_wide).join(
+        summary_df[['max_drawdown', 'return_2008', 'lower_95', 'upper_95']]).join(stress_wide)
+    summary_df = summary_df.rename(columns={
+        'scenario': 'Scenario', 'target_return': 'Target Return', 'volatility': 'Volatility (Std Dev)',
+        'max_drawdown': 'Max Drawdown', 'return_2008': '2008 Return',
+        'lower_95': '95% Lower Bound', 'upper_95': '95% Upper Bound',
+    }).set_index('Scenario')
+
+    # Format columns for better readability
+    for col in summary_df.columns:
+        summary_df[col] = summary_df[col].apply(lambda x: 'N/A' if pd.isna(x) else f"{x:.2%}")
+    summary_df.to_csv(csv_path)
+    return summary_df
+
+
+def render_summary_report(conn, result_id):
+    """Rebuild the text of summary_report.txt for one stored scenario result."""
+    row = conn.execute(
+        "SELECT r.scenario, r.method, r.target_return, r.expected_return, r.volatility, r.max_drawdown, "
+        "r.lower_68, r.upper_68, r.lower_95, r.upper_95, u.data_start, "
+        "r.max_holdings, r.min_position, r.optimal, r.gap, r.lower_bound "
+        "FROM scenario_results r JOIN runs u ON u.run_id = r.run_id WHERE r.result_id = ?",
+        (result_id,)).fetchone()
+    (scenario_name, method, target_return, expected_return, volatility, max_drawdown,
+     one_std_lower, one_std_upper, two_std_lower, two_std_upper, data_start,
+     max_holdings, min_position, optimal, gap, lower_bound) = row
+    allocations = conn.execute(
+        "SELECT ticker, weight FROM allocations WHERE result_id = ? ORDER BY position", (result_id,)).fetchall()
+
+    stress = conn.execute(
+        f"SELECT window, window_start, window_end, {', '.join(STRESS_COLUMNS)} "
+        "FROM stress_results WHERE result_id = ? ORDER BY position", (result_id,)).fetchall()
+
+    annual_returns_df = query_annual_returns(conn, result_id).set_index('year')
+    annual_returns_df.index.name = 'Date'
+    annual_returns_df.columns = ['Annual Return']
+
+    # HRP does not minimize volatility, and a time-limited branch-and-bound result
+    # is only the best found, so neither is labelled optimal or the lowest possible
+    if method == 'hrp':
+        portfolio_label, volatility_label = 'HRP', 'Annual Volatility (HRP, not minimized)'
+    elif optimal is None or optimal:
+        portfolio_label, volatility_label = 'Optimal', 'Lowest Possible Annual Volatility'
+    else:
+        portfolio_label, volatility_label = 'Best-Found', 'Annual Volatility (best found)'
+
+    report_text = f"""
+==================================================
+SUMMARY REPORT FOR SCENARIO: {scenario_name}
+==================================================
+
+{portfolio_label} Portfolio for a Target Return of {target_return:.2%}
+--------------------------------------------------
+"""
+    for t, weight in allocations: report_text += f"  Allocation for {t}: {max(0, weight):.2%}\n"
+    report_text += f"""--------------------------------------------------
+Expected Annual Return: {expected_return:.2%}
+{volatility_label}: {volatility:.2%}
+--------------------------------------------------
+"""
+    if target_return is not None and abs(expected_return - target_return) > 1e-4:
+        report_text += (f"TARGET NOT REACHED: expected return {expected_return:.2%} instead of "
+                        f"{target_return:.2%} ({expected_return - target_return:+.2%}).\n"
+                        "--------------------------------------------------\n")
+    if max_holdings is not None:
+        report_text += f"Holdings Limit: at most {max_holdings} funds"
+        report_text += f", each at least {min_position:.2%}\n" if min_position else "\n"
+        if optimal:
+            report_text += "Search Result: proven optimal\n"
+        else:
+            report_text += (f"Search Result: time limit reached, NOT proven optimal\n"
+                            f"  The lowest possible volatility is at least {lower_bound:.2%} "
+                            f"(at most {gap:.2%} below this allocation).\n")
+        report_text += "--------------------------------------------------\n"
+    report_text += f"""
+Statistical Projections (Forward-Looking)
+--------------------------------------------------
+68% Confidence Interval (1 Std. Dev.):
+  The annual return is expected to be between {one_std_lower:.2%} and {one_std_upper:.2%}.
+
+95% Confidence Interval (2 Std. Dev.):
+  The annual return is expected to be between {two_std_lower:.2%} and {two_std_upper:.2%}.
+
+--- Historical Performance Analysis (Backward-Looking) ---
+
+Portfolio Annual Returns:
+{annual_returns_df.to_string(formatters={'Annual Return': '{:,.2%}'.format})}
+
+Maximum Drawdown (since {data_start[:4]}): {max_drawdown:.2%}
+--------------------------------------------------
+"""
+    if stress:
+        report_text += """
+--- Historical Stress Tests ---
+"""
+        for window, window_start, window_end, total_return, peak_to_trough, recovery_periods, worst_period in stress:
+            report_text += f"\n{window} ({window_start} to {window_end}):\n"
+            if total_return is None:
+                report_text += "  No data in this window.\n"
+                continue
+            recovery = 'not yet recovered' if recovery_periods is None else f"{recovery_periods:.0f} months"
+            report_text += f"  Return over window: {total_return:.2%}\n"
+            report_text += f"  Peak-to-Trough Loss: {peak_to_trough:.2%}\n"
+            report_text += f"  Recovery Time: {recovery}\n"
+            report_text += f"  Worst Month: {worst_period:.2%}\n"
+        report_text += "--------------------------------------------------\n"
+    return report_text
+
+
+def export_summary_report(conn, result_id, report_path):
+    report_text = render_summary_report(conn, result_id)
+    with open(report_path, 'w') as f: f.write(report_text)
+    return report_text
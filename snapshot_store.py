@@ -0,0 +1,228 @@
+import os
+import io
+import json
+import zlib
+import hashlib
+import argparse
+from datetime import datetime
+import pandas as pd
+
+# --- ======================================================================= ---
+# --- PRICE DATA SNAPSHOTS: versioned vintages of the data directory         ---
+# --- ======================================================================= ---
+
+# Every CSV is split into one chunk per calendar year (the raw CSV lines, so a
+# snapshot comes back byte for byte). Chunks are stored once under the SHA-256
+# of their content, so a new vintage only costs the chunks that changed -
+# usually just the current year of each series.
+#
+#   data_snapshots/objects/ab/ab12...   zlib-compressed chunk or series manifest
+#   data_snapshots/tags/<tag>.json      snapshot: {ticker: series manifest hash}
+
+default_store_dir = 'data_snapshots'
+
+
+def _write_object(store_dir, data):
+    digest = hashlib.sha256(data).hexdigest()
+    path = os.path.join(store_dir, 'objects', digest[:2], digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f: f.write(zlib.compress(data))
+        os.replace(tmp_path, path)
+    return digest
+
+
+def _read_object(store_dir, digest):
+    with open(os.path.join(store_dir, 'objects', digest[:2], digest), 'rb') as f:
+        return zlib.decompress(f.read())
+
+
+def _tag_path(store_dir, tag):
+    # The tag is used as a file name, so it must not be able to point anywhere else
+    if not tag or tag in ('.', '..') or any(sep and sep in tag for sep in ('/', '\\', os.sep, os.altsep)):
+        raise ValueError(f"Invalid snapshot tag '{tag}': it cannot be empty or contain path separators.")
+    return os.path.join(store_dir, 'tags', f"{tag}.json")
+
+
+def read_snapshot(tag, store_dir=default_store_dir):
+    with open(_tag_path(store_dir, tag)) as f:
+        return json.load(f)
+
+
+def list_snapshots(store_dir=default_store_dir):
+    tags_dir = os.path.join(store_dir, 'tags')
+    if not os.path.exists(tags_dir):
+        return []
+    snapshots = [read_snapshot(filename[:-5], store_dir) for filename in os.listdir(tags_dir) if filename.endswith('.json')]
+    return sorted(snapshots, key=lambda s: s['created_at'])
+
+
+# --- Writing ---
+
+def _row_year(row):
+    # Year of a row's leading ISO date, or None for rows without one (e.g. blank lines)
+    year = row[:4]
+    return year.decode() if year.isdigit() and row[4:5] == b'-' else None
+
+
+def _store_series(store_dir, file_path):
+    # One chunk per year: rows are grouped on the year of the leading ISO date.
+    # Rows without a date stay in the chunk they are in (leading ones join the first year).
+    with open(file_path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    # An empty file is kept as an empty header with no chunks
+    header, rows = (lines[0], lines[1:]) if lines else (b'', [])
+    chunks, current_year, current_rows = [], None, []
+    for row in rows:
+        year = _row_year(row) or current_year
+        if year != current_year and current_year is not None:
+            chunks.append([current_year, _write_object(store_dir, b''.join(current_rows))])
+            current_rows = []
+        current_year = year
+        current_rows.append(row)
+    if current_rows:
+        chunks.append([current_year or '', _write_object(store_dir, b''.join(current_rows))])
+    manifest = {'header': header.decode(), 'chunks': chunks}
+    return _write_object(store_dir, json.dumps(manifest, sort_keys=True).encode())
+
+
+def _store_dir_series(store_dir, source_dir):
+    series = {}
+    for filename in sorted(os.listdir(source_dir)):
+        if filename.endswith('.csv'):
+            series[filename.split('.')[0]] = _store_series(store_dir, os.path.join(source_dir, filename))
+    return series
+
+
+def _save_snapshot(store_dir, tag, source_dir, note, series):
+    snapshot = {'tag': tag, 'created_at': datetime.now().isoformat(timespec='seconds'),
+                'source_dir': source_dir, 'note': note, 'series': series}
+    tag_path = _tag_path(store_dir, tag)
+    os.makedirs(os.path.dirname(tag_path), exist_ok=True)
+    with open(tag_path, 'w') as f: json.dump(snapshot, f, indent=2, sort_keys=True)
+    return snapshot
+
+
+def create_snapshot(source_dir, tag=None, store_dir=default_store_dir, note=''):
+    """Snapshot every CSV in source_dir under a tag (default: the current date and time)."""
+    tag = tag or datetime.now().strftime('%Y-%m-%d_%H%M%S')
+    if os.path.exists(_tag_path(store_dir, tag)):
+        raise ValueError(f"Snapshot '{tag}' already exists in '{store_dir}'.")
+    return _save_snapshot(store_dir, tag, source_dir, note, _store_dir_series(store_dir, source_dir))
+
+
+def snapshot_for_dir(source_dir, store_dir=default_store_dir, note=''):
+    """The newest snapshot holding exactly the current contents of source_dir, taken now if there is none.
+
+    Unchanged chunks are already in the store, so this mostly just hashes the files.
+    """
+    series = _store_dir_series(store_dir, source_dir)
+    for snapshot in reversed(list_snapshots(store_dir)):
+        if snapshot['series'] == series:
+            return snapshot
+    base_tag = tag = datetime.now().strftime('%Y-%m-%d_%H%M%S')
+    suffix = 2
+    while os.path.exists(_tag_path(store_dir, tag)):
+        tag, suffix = f"{base_tag}_{suffix}", suffix + 1
+    return _save_snapshot(store_dir, tag, source_dir, note, series)
+
+
+# --- Reading ---
+
+def _series_manifest(store_dir, digest):
+    return json.loads(_read_object(store_dir, digest))
+
+
+def _chunks_by_year(manifest):
+    # {year: [chunk hashes in order]} - a year can have several chunks if its rows
+    # are not contiguous. Older snapshots may have chunks keyed on a non-date row
+    # (e.g. a blank line); those are counted with the year before them.
+    by_year, year = {}, None
+    for chunk_year, digest in manifest['chunks']:
+        if chunk_year.isdigit() or year is None:
+            year = chunk_year
+        by_year.setdefault(year, []).append(digest)
+    return by_year
+
+
+def read_series_bytes(tag, ticker, store_dir=default_store_dir):
+    manifest = _series_manifest(store_dir, read_snapshot(tag, store_dir)['series'][ticker])
+    return manifest['header'].encode() + b''.join(_read_object(store_dir, digest) for _, digest in manifest['chunks'])
+
+
+def materialize_snapshot(tag, output_dir, store_dir=default_store_dir):
+    """Write the snapshot back out as a data directory the optimizer can read."""
+    os.makedirs(output_dir, exist_ok=True)
+    for ticker in read_snapshot(tag, store_dir)['series']:
+        with open(os.path.join(output_dir, f"{ticker}.csv"), 'wb') as f:
+            f.write(read_series_bytes(tag, ticker, store_dir))
+    return output_dir
+
+
+def load_snapshot_prices(tag, store_dir=default_store_dir, column='Close'):
+    """{ticker: price Series} for a snapshot, read straight from the store."""
+    all_prices = {}
+    for ticker in read_snapshot(tag, store_dir)['series']:
+        df = pd.read_csv(io.BytesIO(read_series_bytes(tag, ticker, store_dir)), index_col='Date', parse_dates=True)
+        all_prices[ticker] = df[column]
+    return all_prices
+
+
+# --- Comparing vintages ---
+
+def diff_snapshots(old_tag, new_tag, store_dir=default_store_dir):
+    """Which series were added, removed or changed (and in which years) between two snapshots.
+
+    Only manifests are compared - unchanged series and chunks are skipped by hash.
+    """
+    old_series = read_snapshot(old_tag, store_dir)['series']
+    new_series = read_snapshot(new_tag, store_dir)['series']
+    changed = {}
+    for ticker in sorted(old_series.keys() & new_series.keys()):
+        if old_series[ticker] == new_series[ticker]:
+            continue
+        old_chunks = _chunks_by_year(_series_manifest(store_dir, old_series[ticker]))
+        new_chunks = _chunks_by_year(_series_manifest(store_dir, new_series[ticker]))
+        changed[ticker] = sorted(year for year in old_chunks.keys() | new_chunks.keys()
+                                 if old_chunks.get(year) != new_chunks.get(year))
+    return {
+        'added': sorted(new_series.keys() - old_series.keys()),
+        'removed': sorted(old_series.keys() - new_series.keys()),
+        'changed': changed,
+        'unchanged': sorted(t for t in old_series.keys() & new_series.keys() if t not in changed),
+    }
+
+
+# --- Command line: python snapshot_store.py {create,list,diff,checkout} ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Versioned snapshots of the price data directory.')
+    parser.add_argument('--store', default=default_store_dir, help='snapshot store directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    create_cmd = commands.add_parser('create', help='snapshot a data directory')
+    create_cmd.add_argument('source_dir', nargs='?', default='stock_data_yfinance')
+    create_cmd.add_argument('--tag')
+    create_cmd.add_argument('--note', default='')
+    commands.add_parser('list', help='list snapshots')
+    diff_cmd = commands.add_parser('diff', help='compare two snapshots')
+    diff_cmd.add_argument('old_tag'); diff_cmd.add_argument('new_tag')
+    checkout_cmd = commands.add_parser('checkout', help='write a snapshot out as CSV files')
+    checkout_cmd.add_argument('tag'); checkout_cmd.add_argument('output_dir')
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        snapshot = create_snapshot(args.source_dir, args.tag, args.store, args.note)
+        print(f"Saved snapshot '{snapshot['tag']}' with {len(snapshot['series'])} series.")
+    elif args.command == 'list':
+        for snapshot in list_snapshots(args.store):
+            print(f"{snapshot['tag']:<24} {snapshot['created_at']}  {len(snapshot['series']):>5} series  {snapshot['note']}")
+    elif args.command == 'diff':
+        diff = diff_snapshots(args.old_tag, args.new_tag, args.store)
+        print(f"Added: {', '.join(diff['added']) or '-'}")
+        print(f"Removed: {', '.join(diff['removed']) or '-'}")
+        print(f"Unchanged: {len(diff['unchanged'])} series")
+        for ticker, years in diff['changed'].items():
+            print(f"Changed: {ticker} ({', '.join(years)})")
+    elif args.command == 'checkout':
+        materialize_snapshot(args.tag, args.output_dir, args.store)
+        print(f"Snapshot '{args.tag}' written to '{args.output_dir}'.")
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# --- ======================================================================= ---
+# --- HISTORICAL STRESS TESTS: every portfolio against every crisis window   ---
+# --- ======================================================================= ---
+
+# Each window is one dictionary, like the scenarios in the optimizer. Add your
+# own date ranges to STRESS_WINDOWS in optimize_portfolio_allocations.py.
+DEFAULT_STRESS_WINDOWS = [
+    {'name': '2008 GFC', 'start': '2007-10-01', 'end': '2009-03-31'},
+    {'name': '2020 COVID', 'start': '2020-02-01', 'end': '2020-04-30'},
+    {'name': '2022 Rate Shock', 'start': '2022-01-01', 'end': '2022-10-31'},
+]
+
+STRESS_COLUMNS = ['total_return', 'peak_to_trough', 'recovery_periods', 'worst_period_return']
+
+
+def portfolio_period_returns(log_returns_risky, risky_weights, risk_free_weights=None, risk_free_period_return=0.0):
+    """Simple per-period returns for many portfolios at once, shape (periods, portfolios).
+
+    risky_weights is (portfolios, risky assets); the risk-free sleeve earns a flat
+    return each period, the same way the optimizer's growth chart is built.
+    """
+    log_returns = np.asarray(log_returns_risky, dtype=float)
+    risky_weights = np.atleast_2d(np.asarray(risky_weights, dtype=float))
+    period_returns = np.expm1(log_returns @ risky_weights.T)
+    if risk_free_weights is not None:
+        period_returns += np.asarray(risk_free_weights, dtype=float)[None, :] * risk_free_period_return
+    return period_returns
+
+
+def run_stress_tests(dates, period_returns, windows=DEFAULT_STRESS_WINDOWS, portfolio_names=None):
+    """Peak-to-trough loss, recovery time and worst period for every portfolio in every window.
+
+    dates are the period end labels (e.g. log_returns_risky.index) and
+    period_returns is (periods, portfolios). Returns a long DataFrame with one row
+    per (portfolio, window). recovery_periods counts periods from the trough until
+    the pre-crisis peak is regained (looking past the window end) and is NaN if it
+    has not recovered yet.
+    """
+    dates = pd.DatetimeIndex(dates)
+    period_returns = np.asarray(period_returns, dtype=float)
+    if period_returns.ndim == 1:
+        period_returns = period_returns[:, None]
+    num_periods, num_portfolios = period_returns.shape
+    if portfolio_names is None:
+        portfolio_names = list(range(num_portfolios))
+
+    # Precomputed once: log growth per period and its prefix sums, so that
+    # log_wealth[t] is the log of the growth of $1 after t periods.
+    log_growth = np.log1p(period_returns)
+    log_wealth = np.vstack([np.zeros((1, num_portfolios)), np.cumsum(log_growth, axis=0)])
+    row_numbers = np.arange(num_periods + 1)[:, None]
+
+    frames = []
+    for window in windows:
+        first = dates.searchsorted(pd.Timestamp(window['start']), side='left')
+        stop = dates.searchsorted(pd.Timestamp(window['end']), side='right')
+        results = np.full((len(STRESS_COLUMNS), num_portfolios), np.nan)
+        if stop > first:
+            # Wealth path inside the window, starting from the level just before it
+            path = log_wealth[first:stop + 1]
+            running_peak = np.maximum.accumulate(path, axis=0)
+            drawdown = path - running_peak
+            trough = drawdown.argmin(axis=0)
+            peak_level = running_peak[trough, np.arange(num_portfolios)]
+
+            # Recovery: first row after the trough (anywhere in the remaining history)
+            # where wealth is back at the peak level
+            remaining = log_wealth[first:]
+            recovered = (remaining >= peak_level[None, :] - 1e-12) & (row_numbers[:len(remaining)] > trough[None, :])
+            recovery_row = recovered.argmax(axis=0)
+            recovery_periods = np.where(recovered.any(axis=0), recovery_row - trough, np.nan)
+            recovery_periods[drawdown.min(axis=0) >= 0] = 0
+
+            results[0] = np.expm1(log_wealth[stop] - log_wealth[first])
+            results[1] = np.expm1(drawdown.min(axis=0))
+            results[2] = recovery_periods
+            results[3] = np.expm1(log_growth[first:stop].min(axis=0))
+
+        frame = pd.DataFrame(results.T, columns=STRESS_COLUMNS)
+        frame.insert(0, 'portfolio', portfolio_names)
+        frame.insert(1, 'window', window['name'])
+        frame.insert(2, 'window_start', pd.Timestamp(window['start']).strftime('%Y-%m-%d'))
+        frame.insert(3, 'window_end', pd.Timestamp(window['end']).strftime('%Y-%m-%d'))
+        frames.append(frame)
+    if not frames:
+        # No windows configured: an empty table with the same columns
+        return pd.DataFrame(columns=['portfolio', 'window', 'window_start', 'window_end'] + STRESS_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
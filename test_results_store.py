@@ -0,0 +1,29 @@
+import pandas as pd
+from results_store import open_results_db, record_run, query_run_history, query_allocations
+
+
+def _record(conn, created_at, scenario='Moderate_7_Percent'):
+    return record_run(conn, {'created_at': created_at}, [{
+        'scenario': scenario, 'target_return': 0.07, 'expected_return': 0.07, 'volatility': 0.05,
+        'tickers': ['SPY', 'Risk-Free'], 'weights': [0.6, 0.4],
+    }])[0]
+
+
+def test_end_date_includes_the_whole_day(tmp_path):
+    conn = open_results_db(str(tmp_path / 'results.sqlite'))
+    _record(conn, '2026-10-18T23:59:59')
+    same_day = _record(conn, '2026-10-19T09:30:00')
+    _record(conn, '2026-10-20T00:00:00')
+
+    history = query_run_history(conn, end='2026-10-19')
+    assert list(history['created_at']) == ['2026-10-18T23:59:59', '2026-10-19T09:30:00']
+    history = query_run_history(conn, start='2026-10-19', end='2026-10-19')
+    assert list(history['run_id']) == [same_day]
+    assert set(query_allocations(conn, start='2026-10-19', end=pd.Timestamp('2026-10-19'))['run_id']) == {same_day}
+
+
+def test_end_timestamp_is_exact(tmp_path):
+    conn = open_results_db(str(tmp_path / 'results.sqlite'))
+    _record(conn, '2026-10-19T09:30:00')
+    _record(conn, '2026-10-19T12:00:00')
+    assert len(query_run_history(conn, end='2026-10-19 10:00')) == 1
@@ -0,0 +1,194 @@
+import os
+import numpy as np
+import pandas as pd
+
+# --- ======================================================================= ---
+# --- TRADING CALENDAR: one place to normalize and align every price series  ---
+# --- ======================================================================= ---
+
+# Timestamps are normalized once (timezone dropped, time of day dropped) and
+# merged into a single sorted master index. Each series keeps its values as a
+# NumPy array plus the integer positions of its dates in that master index, so
+# aligning is just array indexing - no pandas joins or reindex copies.
+#
+# Fill policies for align():
+#   'intersection' - only dates where every series has a value (the old dropna())
+#   'ffill'        - carry the last value forward; rows before the latest
+#                    series start are dropped
+#   'outer'        - every master date, NaN where a series has no value
+
+ALIGN_POLICIES = ('intersection', 'ffill', 'outer')
+
+
+def _normalized_dates(index):
+    # datetime64[ns] array of the wall-clock dates (pandas' normalize() is much
+    # slower, it tries to infer a frequency for every series)
+    if not isinstance(index, pd.DatetimeIndex):
+        index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]').astype('datetime64[ns]')
+
+
+def normalize_index(index):
+    """Timezone-naive, midnight-normalized DatetimeIndex (wall-clock dates are kept)."""
+    return pd.DatetimeIndex(_normalized_dates(index), name=getattr(index, 'name', None))
+
+
+def _forward_fill_rows(values, observed):
+    # For each row, the row of the most recent observation in each column
+    rows = np.where(observed, np.arange(len(values))[:, None], 0)
+    last_rows = np.maximum.accumulate(rows, axis=0)
+    filled = values[last_rows, np.arange(values.shape[1])]
+    filled[~np.maximum.accumulate(observed, axis=0)] = np.nan
+    return filled
+
+
+def _first_difference(old_dates, old_values, new_dates, new_values):
+    # First date at which two versions of a series differ (None if identical)
+    common = min(len(old_dates), len(new_dates))
+    same = (old_dates[:common] == new_dates[:common]) & (old_values[:common] == new_values[:common])
+    prefix = common if same.all() else int(np.argmin(same))
+    if prefix == len(old_dates) == len(new_dates):
+        return None
+    return min(dates[prefix] for dates in (old_dates, new_dates) if prefix < len(dates))
+
+
+class TradingCalendar:
+    """Master date index for a set of series, with each series' positions stored."""
+
+    def __init__(self, series_by_name):
+        self.names = []
+        self.values = {}
+        dates = {}
+        for name, series in series_by_name.items():
+            values = series.to_numpy(dtype=float)
+            observed = ~np.isnan(values)
+            dates[name] = _normalized_dates(series.index)[observed]
+            self.values[name] = values[observed]
+            self.names.append(name)
+        all_dates = np.concatenate(list(dates.values())) if dates else np.array([], dtype='datetime64[ns]')
+        self.index = pd.DatetimeIndex(np.unique(all_dates), name='Date')
+        self.positions = {name: self.index.values.searchsorted(d) for name, d in dates.items()}
+
+    @classmethod
+    def from_index(cls, index):
+        """A calendar whose master index is an existing date index (e.g. a downloaded series)."""
+        calendar = cls({})
+        calendar.index = pd.DatetimeIndex(np.unique(_normalized_dates(index)), name='Date')
+        return calendar
+
+    def update_series(self, name, series):
+        """Replace (or add) one series in place.
+
+        Other series keep their stored positions; they are only remapped when
+        the master index itself gains or loses dates. Returns the first date at
+        which the series changed (None if it did not change).
+        """
+        values = series.to_numpy(dtype=float)
+        observed = ~np.isnan(values)
+        dates = _normalized_dates(series.index)[observed]
+        values = values[observed]
+        if name in self.values:
+            changed_from = _first_difference(self.index.values[self.positions[name]], self.values[name], dates, values)
+        else:
+            self.names.append(name)
+            changed_from = dates.min() if len(dates) else None
+        self.values[name] = values
+        self.positions[name] = None
+        if not np.isin(dates, self.index.values).all():
+            old_index = self.index.values
+            self.index = pd.DatetimeIndex(np.union1d(old_index, dates), name='Date')
+            remap = self.index.values.searchsorted(old_index)
+            self.positions = {n: None if p is None else remap[p] for n, p in self.positions.items()}
+        self.positions[name] = self.index.values.searchsorted(dates)
+        self._drop_unused_dates()
+        return None if changed_from is None else pd.Timestamp(changed_from)
+
+    def remove_series(self, name):
+        self.names.remove(name)
+        del self.values[name], self.positions[name]
+        self._drop_unused_dates()
+
+    def _drop_unused_dates(self):
+        used = np.zeros(len(self.index), dtype=bool)
+        for positions in self.positions.values():
+            used[positions] = True
+        if not used.all():
+            remap = np.cumsum(used) - 1
+            self.index = self.index[used]
+            self.positions = {n: remap[p] for n, p in self.positions.items()}
+
+    def observed(self, names=None):
+        # (dates x series) boolean matrix of which series have a value on which date
+        names = self.names if names is None else list(names)
+        mask = np.zeros((len(self.index), len(names)), dtype=bool)
+        for j, name in enumerate(names):
+            mask[self.positions[name], j] = True
+        return mask
+
+    def align(self, names=None, policy='intersection', start=None):
+        """(dates, values) with values a (dates x series) NumPy array, columns in names order.
+
+        With start, only the aligned rows on or after that date are built (the
+        same rows a full align would give), so refreshing the tail is cheap.
+        """
+        if policy not in ALIGN_POLICIES:
+            raise ValueError(f"Unknown align policy '{policy}'. Use one of {ALIGN_POLICIES}.")
+        names = self.names if names is None else list(names)
+        first_row = 0 if start is None else self.index.searchsorted(normalize_index([start])[0])
+        # Row 0 holds each series' last value before first_row, for forward filling
+        values = np.full((len(self.index) - first_row + 1, len(names)), np.nan)
+        observed = np.zeros(values.shape, dtype=bool)
+        for j, name in enumerate(names):
+            positions = self.positions[name]
+            tail = positions >= first_row
+            values[positions[tail] - first_row + 1, j] = self.values[name][tail]
+            observed[positions[tail] - first_row + 1, j] = True
+            if policy == 'ffill' and not tail.all():
+                before = np.flatnonzero(~tail)
+                last = before[np.argmax(positions[before])]
+                values[0, j], observed[0, j] = self.values[name][last], True
+        dates = self.index[first_row:]
+
+        if policy == 'intersection':
+            rows = observed[1:].all(axis=1)
+            return dates[rows], values[1:][rows]
+        if policy == 'ffill':
+            values = _forward_fill_rows(values, observed)[1:]
+            first_full_row = max((self.positions[name].min() for name in names if len(self.positions[name])), default=0)
+            skip = max(first_full_row - first_row, 0)
+            return dates[skip:], values[skip:]
+        return dates, values[1:]
+
+    def to_frame(self, names=None, policy='intersection', start=None):
+        names = self.names if names is None else list(names)
+        dates, values = self.align(names, policy, start)
+        return pd.DataFrame(values, index=dates, columns=names)
+
+    def conform(self, series, policy='ffill'):
+        """Put any series on this calendar's dates: as-of (last known) values for 'ffill', else exact matches."""
+        series = series.dropna().sort_index()
+        series_dates = _normalized_dates(series.index)
+        series_values = series.to_numpy(dtype=float)
+        side = 'right' if policy == 'ffill' else 'left'
+        rows = series_dates.searchsorted(self.index.values, side=side)
+        if policy == 'ffill':
+            rows -= 1
+            found = rows >= 0
+        else:
+            found = rows < len(series_dates)
+            found[found] = series_dates[rows[found]] == self.index.values[found]
+        values = np.full(len(self.index), np.nan)
+        values[found] = series_values[rows[found]]
+        return pd.Series(values, index=self.index, name=series.name)
+
+
+def calendar_from_dir(input_dir, column='Close'):
+    """TradingCalendar over every CSV in a data directory (ticker = file name)."""
+    all_prices = {}
+    for filename in os.listdir(input_dir):
+        if filename.endswith('.csv'):
+            df = pd.read_csv(os.path.join(input_dir, filename), index_col='Date', parse_dates=True)
+            all_prices[filename.split('.')[0]] = df[column]
+    return TradingCalendar(all_prices)
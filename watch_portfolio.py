@@ -0,0 +1,263 @@
+import os
+import time
+import importlib
+import numpy as np
+import pandas as pd
+import optimize_portfolio_allocations as optimizer
+from trading_calendar import TradingCalendar, calendar_from_dir
+from snapshot_store import load_snapshot_prices
+
+# --- ======================================================================= ---
+# --- WATCH MODE: re-optimize only what changed                              ---
+# --- ======================================================================= ---
+
+# Run this instead of optimize_portfolio_allocations.py to keep the reports up
+# to date while the data is refreshed or the scenarios are edited:
+#   - a changed CSV is re-read on its own and patched into the trading calendar
+#   - only the aligned rows from the first changed date on are rebuilt (from the
+#     positions the calendar stores) and swapped in for the old return rows
+#   - appended (or revised last) rows update the mean and covariance with
+#     rank-one updates instead of recomputing them
+#   - editing SCENARIOS_TO_RUN re-solves only the scenarios that changed, and
+#     editing the branch-and-bound settings re-solves the max-holdings scenarios
+#   - re-solves are warm-started from the previous weights, and only the
+#     re-solved scenarios get new plots and summary reports
+
+# --- Watch Configuration ---
+poll_interval = 1.0          # seconds between checks for changes
+max_incremental_rows = 12    # if more rows than this changed, recompute the statistics from scratch
+full_recompute_every = 50    # also recompute from scratch after this many incremental updates (limits rounding drift)
+
+
+class IncrementalMoments:
+    """Running mean and covariance of the monthly log returns, updated one row at a time."""
+
+    def __init__(self, rows):
+        rows = np.asarray(rows, dtype=float)
+        self.count = len(rows)
+        self.mean = rows.mean(axis=0)
+        centered = rows - self.mean
+        self.scatter = centered.T @ centered
+        self.updates = 0
+
+    def add(self, row):
+        self.count += 1
+        delta = row - self.mean
+        self.mean = self.mean + delta / self.count
+        self.scatter += np.outer(delta, row - self.mean)
+        self.updates += 1
+
+    def remove(self, row):
+        old_mean = self.mean
+        self.count -= 1
+        self.mean = (old_mean * (self.count + 1) - row) / self.count
+        self.scatter -= np.outer(row - self.mean, row - old_mean)
+        self.updates += 1
+
+    def annualized(self, tickers):
+        # Same numbers as log_returns.mean() * 12 and log_returns.cov() * 12
+        expected_returns = pd.Series(self.mean * 12, index=tickers)
+        cov_matrix = pd.DataFrame(self.scatter / (self.count - 1) * 12, index=tickers, columns=tickers)
+        return expected_returns, cov_matrix
+
+
+def config_fingerprint():
+    # Changing any of these means every scenario has to be redone
+    return repr((optimizer.input_dir, optimizer.data_snapshot, optimizer.align_policy, optimizer.add_risk_free_asset,
+                 optimizer.risk_free_rate, optimizer.initial_investment, optimizer.STRESS_WINDOWS,
+                 optimizer.results_db_path))
+
+
+def bnb_fingerprint():
+    # These only affect the max-holdings (branch-and-bound) scenarios
+    return repr((optimizer.bnb_time_limit, optimizer.bnb_workers))
+
+
+class PortfolioWatcher:
+    def __init__(self, main_reports_dir='reports'):
+        self.scenario_file = optimizer.__file__
+        self.main_reports_dir = main_reports_dir
+        os.makedirs(main_reports_dir, exist_ok=True)
+        self.full_reload()
+
+    # --- Loading ---
+
+    def _data_signatures(self):
+        if optimizer.data_snapshot:
+            return {}
+        signatures = {}
+        for filename in os.listdir(optimizer.input_dir):
+            if filename.endswith('.csv'):
+                stat = os.stat(os.path.join(optimizer.input_dir, filename))
+                signatures[filename] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def full_reload(self):
+        print(f"\n{'='*60}\nLoading all data and running every scenario\n{'='*60}")
+        self.config = config_fingerprint()
+        self.bnb_config = bnb_fingerprint()
+        self.scenario_mtime = os.stat(self.scenario_file).st_mtime_ns
+        self.file_signatures = self._data_signatures()
+        self.data_vintage = optimizer.current_data_vintage(optimizer.input_dir, optimizer.data_snapshot)
+        if optimizer.data_snapshot:
+            self.calendar = TradingCalendar(load_snapshot_prices(optimizer.data_snapshot))
+        else:
+            self.calendar = calendar_from_dir(optimizer.input_dir)
+        self.results = {}
+        self._rebuild_returns()
+        self.resolve(optimizer.SCENARIOS_TO_RUN)
+
+    def _rebuild_returns(self):
+        # Align every row and recompute the statistics (start up, or funds added or removed)
+        self.price_df = self.calendar.to_frame(policy=optimizer.align_policy)
+        self.log_returns = optimizer.log_returns_from_prices(self.price_df)
+        self.moments = IncrementalMoments(self.log_returns.values)
+
+    def _update_returns(self, changed_from):
+        # Re-align only the rows from changed_from on, swap them in for the old rows
+        # and bring the running statistics up to date. Returns False if the returns
+        # did not change.
+        cut = self.price_df.index.searchsorted(changed_from)
+        if cut == 0:
+            self._rebuild_returns()
+            print("  Returns: changed from the first row - statistics recomputed")
+            return True
+        head_prices = self.price_df.iloc[:cut]
+        tail_prices = self.calendar.to_frame(self.price_df.columns, optimizer.align_policy, start=changed_from)
+        prices = np.vstack([head_prices.values[-1:], tail_prices.values])
+        added = pd.DataFrame(np.diff(np.log(prices), axis=0), index=tail_prices.index, columns=tail_prices.columns)
+        removed = self.log_returns.iloc[cut - 1:]
+        if removed.index.equals(added.index) and np.array_equal(removed.values, added.values):
+            return False
+        self.price_df = pd.concat([head_prices, tail_prices])
+        self.log_returns = pd.concat([self.log_returns.iloc[:cut - 1], added])
+
+        removed, added = removed.values, added.values
+        if (len(removed) + len(added) > max_incremental_rows or self.moments.updates >= full_recompute_every
+                or self.moments.count - len(removed) < 2):
+            self.moments = IncrementalMoments(self.log_returns.values)
+            print(f"  Returns: {len(removed)} old rows replaced by {len(added)} new rows - statistics recomputed")
+        else:
+            for row in removed:
+                self.moments.remove(row)
+            for row in added:
+                self.moments.add(row)
+            print(f"  Returns: {len(removed)} old rows replaced by {len(added)} new rows - statistics updated incrementally")
+        return True
+
+    # --- Solving ---
+
+    def resolve(self, scenarios):
+        tickers_from_files = list(self.log_returns.columns)
+        annual_returns, annual_cov = self.moments.annualized(tickers_from_files)
+        new_results = []
+        for scenario in scenarios:
+            scenario_name = scenario['name']
+            print(f"\n{'='*60}\nRunning Scenario: {scenario_name}\n{'='*60}")
+            tickers, expected_returns, cov_matrix = optimizer.prepare_optimizer_inputs(
+                self.log_returns, tickers_from_files, annual_returns, annual_cov)
+            previous = self.results.get(scenario_name)
+            warm_start = previous['weights'] if previous is not None and previous['tickers'] == tickers else None
+            optimization_result = optimizer.optimize_scenario(scenario, tickers, expected_returns, cov_matrix, warm_start)
+            if optimization_result.success:
+                print(f"\nOptimization for '{scenario_name}' SUCCEEDED.")
+                new_results.append(optimizer.analyze_scenario(
+                    scenario, optimization_result, tickers, expected_returns, cov_matrix,
+                    self.log_returns, self.main_reports_dir))
+            else:
+                print(f"Optimization for '{scenario_name}' FAILED. Message: {optimization_result.message}")
+                self.results.pop(scenario_name, None)
+
+        if new_results:
+            optimizer.add_stress_tests(new_results, self.log_returns)
+            self.results.update({result['scenario']: result for result in new_results})
+        # Record the full current set; only the re-solved scenarios get new reports
+        current = [self.results[s['name']] for s in optimizer.SCENARIOS_TO_RUN if s['name'] in self.results]
+        if current:
+            optimizer.save_and_report(current, self.price_df, self.main_reports_dir, self.data_vintage,
+                                      report_scenarios={result['scenario'] for result in new_results})
+
+    # --- Watching ---
+
+    def _check_scenario_file(self):
+        scenario_mtime = os.stat(self.scenario_file).st_mtime_ns
+        if scenario_mtime == self.scenario_mtime:
+            return
+        self.scenario_mtime = scenario_mtime
+        old_scenarios = {s['name']: s for s in optimizer.SCENARIOS_TO_RUN}
+        try:
+            importlib.reload(optimizer)
+        except Exception as e:
+            print(f"Could not reload '{self.scenario_file}' (will retry on the next save): {e}")
+            return
+        if config_fingerprint() != self.config:
+            print("General configuration changed.")
+            self.full_reload()
+            return
+        bnb_changed = bnb_fingerprint() != self.bnb_config
+        self.bnb_config = bnb_fingerprint()
+
+        new_names = {s['name'] for s in optimizer.SCENARIOS_TO_RUN}
+        for name in old_scenarios.keys() - new_names:
+            self.results.pop(name, None)
+        changed = [s for s in optimizer.SCENARIOS_TO_RUN if old_scenarios.get(s['name']) != s
+                   or (bnb_changed and optimizer.allocation_method(s) == 'max_holdings')]
+        if changed or old_scenarios.keys() - new_names:
+            print(f"\nScenarios changed: {', '.join(s['name'] for s in changed) or '(removed only)'}")
+            self.resolve(changed)
+
+    def _check_data_files(self):
+        signatures = self._data_signatures()
+        if signatures == self.file_signatures:
+            return
+        changed = [f for f in signatures if self.file_signatures.get(f) != signatures[f]]
+        deleted = [f for f in self.file_signatures if f not in signatures]
+        print(f"\nData files changed: {', '.join(changed + deleted)}")
+        funds_changed, changed_from = bool(deleted), None
+        for filename in deleted:
+            self.calendar.remove_series(filename.split('.')[0])
+        for filename in changed:
+            ticker = filename.split('.')[0]
+            try:
+                df = pd.read_csv(os.path.join(optimizer.input_dir, filename), index_col='Date', parse_dates=True)
+                is_new = ticker not in self.calendar.names
+                series_changed_from = self.calendar.update_series(ticker, df['Close'])
+            except Exception as e:
+                # Probably still being written; leave its old signature so it is retried
+                print(f"  Could not read {filename} yet: {e}")
+                signatures[filename] = self.file_signatures.get(filename)
+                continue
+            funds_changed |= is_new
+            if series_changed_from is not None:
+                changed_from = series_changed_from if changed_from is None else min(changed_from, series_changed_from)
+        self.file_signatures = signatures
+
+        if funds_changed:
+            self._rebuild_returns()
+            print("  Funds added or removed - returns and statistics recomputed")
+        elif changed_from is None or not self._update_returns(changed_from):
+            print("  No change to the aligned returns; nothing to re-solve.")
+            return
+        self.data_vintage = optimizer.current_data_vintage(optimizer.input_dir)
+        # Every scenario uses the whole universe, so all of them are affected
+        self.resolve(optimizer.SCENARIOS_TO_RUN)
+
+    def poll(self):
+        start_time = time.time()
+        self._check_scenario_file()
+        self._check_data_files()
+        elapsed = time.time() - start_time
+        if elapsed > 0.05:
+            print(f"-> Refreshed in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    watcher = PortfolioWatcher()
+    watched = f"snapshot '{optimizer.data_snapshot}'" if optimizer.data_snapshot else f"'{optimizer.input_dir}'"
+    print(f"\nWatching {watched} and '{os.path.basename(watcher.scenario_file)}' for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(poll_interval)
+            watcher.poll()
+    except KeyboardInterrupt:
+        print("\nStopped watching.")